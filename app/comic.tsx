@@ -16,6 +16,12 @@ import { useLocalSearchParams, router } from 'expo-router';
 const BACKEND_URL = process.env.EXPO_PUBLIC_BACKEND_URL;
 const { width } = Dimensions.get('window');
 
+// Panel images are served by reference from GridFS; legacy episodes may still carry them inline
+const panelImageUri = (panel: any) =>
+  panel.image_ref
+    ? `${BACKEND_URL}/api/panels/${panel.image_ref}/image`
+    : `data:image/png;base64,${panel.image_base64}`;
+
 export default function ComicScreen() {
   const params = useLocalSearchParams();
   const episodeId = params.episodeId as string;
@@ -43,7 +49,7 @@ export default function ComicScreen() {
 
       // Auto-generate images for panels without images
       for (const panel of data.panels) {
-        if (!panel.image_base64) {
+        if (!panel.image_ref && !panel.image_base64) {
           generatePanelImage(panel.panel_id);
         }
       }
@@ -88,7 +94,9 @@ export default function ComicScreen() {
       setEpisode((prevEpisode: any) => {
         const updatedPanels = prevEpisode.panels.map((panel: any) => {
           if (panel.panel_id === panelId) {
-            return { ...panel, image_base64: data.image_base64 };
+            return data.image_ref
+              ? { ...panel, image_ref: data.image_ref }
+              : { ...panel, image_base64: data.image_base64 };
           }
           return panel;
         });
@@ -168,9 +176,9 @@ export default function ComicScreen() {
 
               {/* Image */}
               <View style={styles.imageContainer}>
-                {panel.image_base64 ? (
+                {panel.image_ref || panel.image_base64 ? (
                   <Image
-                    source={{ uri: `data:image/png;base64,${panel.image_base64}` }}
+                    source={{ uri: panelImageUri(panel) }}
                     style={styles.panelImage}
                     resizeMode="contain"
                   />
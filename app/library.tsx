@@ -14,6 +14,12 @@ import { router } from 'expo-router';
 
 const BACKEND_URL = process.env.EXPO_PUBLIC_BACKEND_URL;
 
+// Panel images are served by reference from GridFS; legacy episodes may still carry them inline
+const panelImageUri = (panel: any) =>
+  panel.image_ref
+    ? `${BACKEND_URL}/api/panels/${panel.image_ref}/image`
+    : `data:image/png;base64,${panel.image_base64}`;
+
 export default function LibraryScreen() {
   const [episodes, setEpisodes] = useState<any[]>([]);
   const [isLoading, setIsLoading] = useState(true);
@@ -91,7 +97,7 @@ export default function LibraryScreen() {
   };
 
   const renderEpisodeCard = ({ item }: { item: any }) => {
-    const firstPanelWithImage = item.panels.find((p: any) => p.image_base64);
+    const firstPanelWithImage = item.panels.find((p: any) => p.image_ref || p.image_base64);
     const panelCount = item.panels.length;
     const createdDate = new Date(item.created_date).toLocaleDateString();
 
@@ -105,9 +111,7 @@ export default function LibraryScreen() {
           <View style={styles.thumbnailContainer}>
             {firstPanelWithImage ? (
               <Image
-                source={{
-                  uri: `data:image/png;base64,${firstPanelWithImage.image_base64}`,
-                }}
+                source={{ uri: panelImageUri(firstPanelWithImage) }}
                 style={styles.thumbnail}
                 resizeMode="cover"
               />
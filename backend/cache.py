@@ -0,0 +1,47 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """
+    Canonical form of the text: lowercased words in order, ignoring punctuation and spacing.
+    """
+    return " ".join(_TOKEN_RE.findall(text.lower()))
+
+
+class StoryCache:
+    """
+    In-memory LRU cache with a TTL, keyed by (namespace, key, normalized text),
+    so a resubmitted story hits even if its case, punctuation or spacing changed.
+    Any edit to the words themselves is a different story and misses.
+    """
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (namespace, key, normalized text) -> (expires_at, value)
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, namespace: str, key: str, text: str) -> Optional[Any]:
+        cache_key = (namespace, key, normalize(text))
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[cache_key]
+            return None
+        self._entries.move_to_end(cache_key)
+        return value
+
+    def set(self, namespace: str, key: str, text: str, value: Any) -> None:
+        cache_key = (namespace, key, normalize(text))
+        self._entries[cache_key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(cache_key)
+        # Least recently used entries go first
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,144 @@
+from fastapi import HTTPException
+from contextlib import asynccontextmanager
+from typing import AsyncContextManager, AsyncIterator, NamedTuple, Protocol
+import os
+import logging
+import urllib.parse
+import httpx
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 65536
+
+# Used when the upstream response doesn't say what it sent
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+
+# ========== PROMPTS ==========
+
+POLLINATIONS_PROMPT_SUFFIX = ", high quality, detailed line art"
+POLLINATIONS_PROMPT_TEMPLATE = "manga style comic panel, black and white, screentones, {scene}, character {character}, setting {background}, mood {mood}" + POLLINATIONS_PROMPT_SUFFIX
+
+FAL_PROMPT_TEMPLATE = """Manga style comic panel, black and white with screentones:
+{scene}
+Character: {character}
+Setting: {background}
+Mood: {mood}
+
+Style: Japanese manga, dramatic angles, expressive emotions, clean linework, screentone shading, professional manga artist quality."""
+
+# ========== BACKENDS ==========
+
+class ImageStream(NamedTuple):
+    content_type: str
+    chunks: AsyncIterator[bytes]
+
+def response_content_type(response: httpx.Response) -> str:
+    # Keep only the media type, parameters like charset mean nothing for an image
+    content_type = response.headers.get("content-type", "").split(";")[0].strip()
+    return content_type or DEFAULT_CONTENT_TYPE
+
+def image_stream(response: httpx.Response) -> ImageStream:
+    return ImageStream(response_content_type(response), response.aiter_bytes(CHUNK_SIZE))
+
+class ImageProvider(Protocol):
+    name: str
+
+    def generate(self, client: httpx.AsyncClient, scene_description: str, dialogue: str, character_profile: str, background: str, seed: int) -> AsyncContextManager[ImageStream]:
+        """
+        Render one panel and stream it back with the content type the upstream reported.
+        The upstream connection stays open until the context exits.
+        Raises HTTPException carrying the upstream status code on failure.
+        """
+        ...
+
+class PollinationsBackend:
+    """
+    Pollinations.ai free image API.
+    """
+    name = "Pollinations.ai"
+
+    @asynccontextmanager
+    async def generate(self, client: httpx.AsyncClient, scene_description: str, dialogue: str, character_profile: str, background: str, seed: int) -> AsyncIterator[ImageStream]:
+        prompt = POLLINATIONS_PROMPT_TEMPLATE.format(
+            scene=scene_description,
+            character=character_profile,
+            background=background,
+            mood=dialogue
+        )
+        encoded_prompt = urllib.parse.quote_from_bytes(prompt.encode('utf-8'), safe='')
+        image_url = f"https://image.pollinations.ai/prompt/{encoded_prompt}"
+
+        # Increased timeout to 90 seconds for slower connections/cold starts
+        async with client.stream(
+            "GET",
+            image_url,
+            params={"width": 1024, "height": 1024, "seed": seed, "nologo": "true"},
+            timeout=90.0
+        ) as response:
+            if response.status_code == 429:
+                logger.warning("Pollinations API rate limit (429)")
+                raise HTTPException(status_code=429, detail="Rate limit exceeded")
+            if response.status_code != 200:
+                logger.warning("Pollinations API returned %s", response.status_code)
+                raise HTTPException(status_code=response.status_code, detail=f"Pollinations API error: {response.status_code}")
+
+            yield image_stream(response)
+
+class FalBackend:
+    """
+    fal.ai FLUX image model. Requires the fal-client package and FAL_KEY.
+    """
+    name = "fal.ai"
+
+    def __init__(self):
+        if not os.environ.get('FAL_KEY'):
+            raise ValueError("FAL_KEY environment variable is required for the fal image backend")
+        # Optional dependency, only needed when this backend is selected
+        import fal_client
+        self.fal_client = fal_client
+
+    @asynccontextmanager
+    async def generate(self, client: httpx.AsyncClient, scene_description: str, dialogue: str, character_profile: str, background: str, seed: int) -> AsyncIterator[ImageStream]:
+        prompt = FAL_PROMPT_TEMPLATE.format(
+            scene=scene_description,
+            character=character_profile,
+            background=background,
+            mood=dialogue
+        )
+
+        result = await self.fal_client.run_async(
+            "fal-ai/flux/dev",
+            arguments={
+                "prompt": prompt,
+                "image_size": "square_hd",
+                "num_inference_steps": 28,
+                "guidance_scale": 3.5,
+                "num_images": 1,
+                "seed": seed,
+                "enable_safety_checker": False
+            }
+        )
+
+        if not result or not result.get("images"):
+            raise HTTPException(status_code=500, detail="No image was generated")
+
+        async with client.stream("GET", result["images"][0]["url"], timeout=90.0) as response:
+            if response.status_code != 200:
+                raise HTTPException(status_code=response.status_code, detail=f"Failed to download generated image: {response.status_code}")
+
+            yield image_stream(response)
+
+IMAGE_BACKENDS = {
+    "pollinations": PollinationsBackend,
+    "fal": FalBackend,
+}
+
+def get_image_backend(name: str) -> ImageProvider:
+    """
+    Build the image backend selected by name (the IMAGE_BACKEND env var).
+    """
+    try:
+        backend_class = IMAGE_BACKENDS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown IMAGE_BACKEND '{name}', expected one of: {', '.join(IMAGE_BACKENDS)}")
+    return backend_class()
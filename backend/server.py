@@ -1,21 +1,33 @@
 from fastapi import FastAPI, APIRouter, HTTPException
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from bson import ObjectId
+from bson.errors import InvalidId
+from gridfs.errors import NoFile
+from tenacity import AsyncRetrying, RetryError, before_sleep_log, retry_if_exception, stop_after_attempt, wait_exponential, wait_random
+from pymongo import UpdateOne
 import os
 import sys
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 import uuid
 from datetime import datetime
 import base64
+import asyncio
 import httpx
 import urllib.parse
-import json
-import re
+import orjson
 import certifi
+from contextlib import asynccontextmanager
+import hashlib
+import mimetypes
+import re
+from cache import StoryCache
+from image_backends import ImageStream, get_image_backend
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -32,40 +44,50 @@ if not mongo_url:
     print("WARNING: MONGO_URL environment variable is not set")
     mongo_url = "mongodb://localhost:27017" # Fallback for local testing if needed
 
-# Add retryWrites to the connection string if it's a cloud URI
-if mongo_url.startswith("mongodb+srv://") and '?' not in mongo_url:
-    mongo_url += '?retryWrites=true'
-elif mongo_url.startswith("mongodb+srv://") and '?' in mongo_url and 'retryWrites' not in mongo_url:
-    mongo_url += '&retryWrites=true'
+DB_NAME = os.environ.get('DB_NAME', 'dailytoon')
 
+# Verify Atlas certificates against certifi's CA bundle; plain local URIs don't use TLS
+tls_options = {}
+if mongo_url.startswith("mongodb+srv://") or "tls=true" in mongo_url or "ssl=true" in mongo_url:
+    tls_options["tlsCAFile"] = certifi.where()
+
+# Connection pools are created in the lifespan handler so every uvicorn worker owns its own
 client = None
 db = None
-
-# MongoDB connection with SSL compatibility for Python 3.13+
-# Using tlsAllowInvalidCertificates to bypass SSL verification issues on Render
-try:
-    print(f"Attempting to connect to MongoDB...")
-    # For Python 3.13.4 on Render, we need to allow invalid certificates
-    # This is safe for MongoDB Atlas connections
-    client = AsyncIOMotorClient(
-        mongo_url, 
-        tlsAllowInvalidCertificates=True,
-        serverSelectionTimeoutMS=10000
+image_bucket = None
+
+# Image generation backend: "pollinations" (default, free) or "fal" (needs FAL_KEY and fal-client)
+IMAGE_BACKEND = os.environ.get('IMAGE_BACKEND', 'pollinations')
+image_backend = get_image_backend(IMAGE_BACKEND)
+print(f"Using image backend: {image_backend.name}")
+
+# Caps concurrent image downloads so a burst of panel generation can't take every pooled connection
+IMAGE_SEM = asyncio.Semaphore(32)
+
+# Storyboards for resubmitted stories (up to case, punctuation and spacing) are served from memory instead of re-asking the LLM
+storyboard_cache = StoryCache(ttl=3600.0)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connect_clients()
+    # Shared HTTP client for Pollinations and image downloads, reused so TLS connections stay alive between requests
+    app.state.http = httpx.AsyncClient(
+        timeout=60.0,
+        limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100, keepalive_expiry=15.0),
+        http2=True
     )
-    print("MongoDB client initialized")
-except Exception as connection_error:
-    print(f"MongoDB connection failed: {connection_error}")
-    # We don't raise here to allow the app to start, but DB ops will fail
-
-DB_NAME = os.environ.get('DB_NAME', 'dailytoon')
-if client:
-    db = client[DB_NAME]
-    print(f"Using database: {DB_NAME}")
-else:
-    print("CRITICAL: Could not initialize MongoDB client. Database operations will fail.")
+    await create_indexes()
+    # Runs in the background so a large backlog of legacy images doesn't hold up startup
+    migration = asyncio.create_task(migrate_inline_images())
+    try:
+        yield
+    finally:
+        migration.cancel()
+        await app.state.http.aclose()
+        shutdown_db_client()
 
 # Create the main app
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
 # Configure logging
@@ -77,27 +99,41 @@ logger = logging.getLogger(__name__)
 
 # ========== MODELS ==========
 
-class Panel(BaseModel):
+class PanelSummary(BaseModel):
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
+    
     panel_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     order: int
     scene_description: str
     dialogue: str
     character_description: str
     background: str
+    image_ref: Optional[str] = None
+
+class Panel(PanelSummary):
+    # Legacy inline image, only present on episodes created before images moved to GridFS
     image_base64: Optional[str] = None
 
-class ComicEpisode(BaseModel):
+class ComicEpisodeSummary(BaseModel):
+    # Documents come straight from Mongo, so unknown keys such as _id are dropped
+    model_config = ConfigDict(extra='ignore', validate_assignment=False)
+    
     episode_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     title: str
     user_story_text: str
     created_date: datetime = Field(default_factory=datetime.utcnow)
-    panels: List[Panel] = []
+    panels: List[PanelSummary] = []
     character_profile: Optional[str] = None
 
+class ComicEpisode(ComicEpisodeSummary):
+    panels: List[Panel] = []
+
 class StorySubmit(BaseModel):
     story_text: str
     character_name: Optional[str] = None
     character_appearance: Optional[str] = None
+    # Render the first panel before saving so the episode is written once with its image
+    generate_first_image: bool = False
 
 class StoryboardResponse(BaseModel):
     episode_id: str
@@ -109,26 +145,35 @@ class PanelGenerateRequest(BaseModel):
     episode_id: str
     panel_id: str
 
-# ========== HELPER FUNCTIONS ==========
+class PanelGenerateAllRequest(BaseModel):
+    episode_id: str
+    # Restrict generation to these panels; defaults to every panel of the episode
+    panel_ids: Optional[List[str]] = None
 
-async def analyze_story_and_create_storyboard(story_text: str, character_name: Optional[str], character_appearance: Optional[str]) -> dict:
-    """
-    Use Pollinations.ai (Free Text API) to analyze the story and create a storyboard.
-    """
-    try:
-        # Create character profile
-        char_name = character_name or "the main character"
-        char_appearance = character_appearance or "a young person with expressive eyes, dark hair, casual modern clothing"
-        
-        character_profile = f"{char_name}: {char_appearance}"
-        
-        # Construct prompt for Pollinations
-        system_instruction = "You are a manga story expert. Analyze the story and break it into 4-6 dramatic manga-style scenes. Return ONLY valid JSON."
-        
-        prompt = f"""{system_instruction}
+class PanelLLM(BaseModel):
+    # One panel as the LLM describes it; unknown keys are ignored
+    scene_description: str
+    dialogue: str = "..."
+    background: str = "A simple background"
+
+class StoryboardLLM(BaseModel):
+    # Shape we ask the LLM for; a reply that doesn't fit falls back to the stub storyboard
+    title: str = "My Daily Story"
+    # At least one panel, so {} or a stray prose object never becomes an empty episode
+    panels: List[PanelLLM] = Field(min_length=1)
+
+# ========== PROMPTS ==========
 
-Story: {story_text}
-Main Character: {character_profile}
+DEFAULT_CHARACTER_NAME = "the main character"
+DEFAULT_CHARACTER_APPEARANCE = "a young person with expressive eyes, dark hair, casual modern clothing"
+
+STORYBOARD_SYSTEM_INSTRUCTION = "You are a manga story expert. Analyze the story and break it into 4-6 dramatic manga-style scenes. Return ONLY valid JSON."
+
+# Built once; each request only fills in the placeholders
+STORYBOARD_PROMPT_TEMPLATE = STORYBOARD_SYSTEM_INSTRUCTION + """
+
+Story: {story}
+Main Character: {profile}
 
 Create 4-6 manga panels. For each panel provide:
 1. scene_description (visual)
@@ -147,42 +192,105 @@ Format as JSON:
   ]
 }}
 """
+
+# ========== HELPER FUNCTIONS ==========
+
+# LLM replies often wrap the JSON object in a markdown code fence
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+
+def extract_json_object(text: str) -> Optional[str]:
+    """
+    Return the first balanced {...} object in text, skipping braces inside string literals.
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+async def analyze_story_and_create_storyboard(http_client: httpx.AsyncClient, story_text: str, character_name: Optional[str], character_appearance: Optional[str]) -> dict:
+    """
+    Use Pollinations.ai (Free Text API) to analyze the story and create a storyboard.
+    """
+    try:
+        # Create character profile
+        char_name = character_name or DEFAULT_CHARACTER_NAME
+        char_appearance = character_appearance or DEFAULT_CHARACTER_APPEARANCE
+        
+        character_profile = f"{char_name}: {char_appearance}"
+        
+        cacheable = bool(story_text.strip())
+        if cacheable:
+            cached = storyboard_cache.get("storyboard", character_profile, story_text)
+            if cached is not None:
+                logger.info("Storyboard cache hit")
+                return {
+                    "title": cached["title"],
+                    "character_profile": character_profile,
+                    "panels": cached["panels"]
+                }
+        
+        # Construct prompt for Pollinations
+        prompt = STORYBOARD_PROMPT_TEMPLATE.format_map({"story": story_text, "profile": character_profile})
         
         logger.info("Sending request to Pollinations Text API...")
-        encoded_prompt = urllib.parse.quote(prompt)
+        encoded_prompt = urllib.parse.quote_from_bytes(prompt.encode('utf-8'), safe='')
         url = f"https://text.pollinations.ai/{encoded_prompt}"
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.get(url)
-            if response.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"Pollinations Text API failed: {response.status_code}")
-            
-            response_text = response.text
-            logger.info(f"Pollinations Response: {response_text[:100]}...")
-
-        # Parse JSON
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
+        response = await http_client.get(url)
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail=f"Pollinations Text API failed: {response.status_code}")
+        
+        response_text = response.text
+        logger.info("Pollinations Response (%s): %.100s...", response.http_version, response_text)
+
+        # Parse JSON, preferring the object inside a ``` / ```json fence when there is one
+        fence_match = _FENCE_RE.search(response_text)
+        if fence_match:
+            response_text = fence_match.group(1)
             
         try:
-            storyboard_data = json.loads(response_text)
-        except json.JSONDecodeError:
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                storyboard_data = json.loads(json_match.group())
+            storyboard_data = orjson.loads(response_text)
+        except orjson.JSONDecodeError:
+            json_text = extract_json_object(response_text)
+            if json_text:
+                storyboard_data = orjson.loads(json_text)
             else:
                 raise ValueError("Could not parse JSON from response")
 
+        storyboard = StoryboardLLM.model_validate(storyboard_data, strict=False).model_dump()
+
+        if cacheable:
+            storyboard_cache.set("storyboard", character_profile, story_text, storyboard)
+
         return {
-            "title": storyboard_data.get("title", "My Daily Story"),
+            "title": storyboard["title"],
             "character_profile": character_profile,
-            "panels": storyboard_data.get("panels", [])
+            "panels": storyboard["panels"]
         }
         
     except Exception as e:
-        logger.error(f"Error in story analysis: {str(e)}")
+        logger.error("Error in story analysis: %s", e)
         return {
             "title": "My Daily Story",
             "character_profile": character_profile,
@@ -195,65 +303,166 @@ Format as JSON:
             ]
         }
 
-async def generate_manga_image_pollinations(scene_description: str, dialogue: str, character_profile: str, background: str) -> str:
+def is_retryable_image_error(error: BaseException) -> bool:
+    """
+    Retry network failures, rate limits and upstream 5xx; other client errors fail fast.
+    """
+    if isinstance(error, httpx.TransportError):
+        return True
+    return isinstance(error, HTTPException) and (error.status_code == 429 or error.status_code >= 500)
+
+async def generate_manga_image(http_client: httpx.AsyncClient, scene_description: str, dialogue: str, character_profile: str, background: str, seed: int) -> str:
     """
-    Generate a manga-style image using Pollinations.ai (Free API).
-    Returns base64 encoded image.
+    Generate a manga-style image with the configured image backend.
+    The image is streamed straight into GridFS; returns the image reference.
     """
     # Retry configuration for rate limits
     max_retries = 5
     base_delay = 5  # Start with 5 seconds
     
-    last_error = None
+    # Exponential backoff with jitter: delay * 2^attempt + random(0-1s)
+    retrying = AsyncRetrying(
+        stop=stop_after_attempt(max_retries),
+        wait=wait_exponential(multiplier=base_delay) + wait_random(0, 1),
+        retry=retry_if_exception(is_retryable_image_error),
+        before_sleep=before_sleep_log(logger, logging.WARNING)
+    )
     
-    for attempt in range(max_retries):
-        try:
-            base_prompt = f"manga style comic panel, black and white, screentones, {scene_description}, character {character_profile}, setting {background}, mood {dialogue}, high quality, detailed line art"
-            encoded_prompt = urllib.parse.quote(base_prompt)
-            
-            # Add random seed to avoid caching issues
-            seed = uuid.uuid4().int % 100000
-            image_url = f"https://image.pollinations.ai/prompt/{encoded_prompt}?width=1024&height=1024&seed={seed}&nologo=true"
-            
-            logger.info(f"Generating image with Pollinations.ai (Attempt {attempt + 1}/{max_retries})")
-            
-            # Increased timeout to 90 seconds for slower connections/cold starts
-            async with httpx.AsyncClient(timeout=90.0) as client:
-                response = await client.get(image_url)
-                if response.status_code == 200:
-                    image_bytes = response.content
-                    image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-                    return image_base64
-                elif response.status_code == 429:
-                    logger.warning(f"Pollinations API rate limit (429) on attempt {attempt + 1}")
-                    # Force retry for 429
-                    raise HTTPException(status_code=429, detail="Rate limit exceeded")
-                else:
-                    logger.warning(f"Pollinations API returned {response.status_code}")
-                    if response.status_code >= 500:
-                        # Server error, retry
-                        raise HTTPException(status_code=500, detail=f"Pollinations API error: {response.status_code}")
-                    else:
-                        # Client error (other than 429), don't retry
-                        raise HTTPException(status_code=response.status_code, detail=f"Pollinations API error: {response.status_code}")
+    try:
+        async for attempt in retrying:
+            with attempt:
+                attempt_number = attempt.retry_state.attempt_number
+                logger.info("Generating image with %s (Attempt %s/%s)", image_backend.name, attempt_number, max_retries)
                 
+                async with IMAGE_SEM, image_backend.generate(
+                    http_client,
+                    scene_description=scene_description,
+                    dialogue=dialogue,
+                    character_profile=character_profile,
+                    background=background,
+                    seed=seed
+                ) as image:
+                    return await store_panel_image(image)
+    except RetryError as e:
+        last_error = e.last_attempt.exception()
+        raise HTTPException(status_code=502, detail=f"Image generation failed after {max_retries} attempts: {str(last_error)}")
+    except HTTPException as e:
+        # Backends report upstream failures with the upstream status; an upstream 404 or 400
+        # must not reach the client looking like the endpoint's own answer
+        raise HTTPException(status_code=502, detail=f"Image generation failed: {e.detail}")
+
+async def store_panel_image(image: ImageStream) -> str:
+    """
+    Stream an image into GridFS, tagged with its upstream content type, and return the file id as a string.
+    A partial upload is discarded if the source fails midway.
+    """
+    filename = "panel" + (mimetypes.guess_extension(image.content_type) or "")
+    upload = image_bucket.open_upload_stream(filename, metadata={"contentType": image.content_type})
+    try:
+        async for chunk in image.chunks:
+            await upload.write(chunk)
+        await upload.close()
+    except BaseException:
+        await upload.abort()
+        raise
+    return str(upload._id)
+
+async def load_panel_image(image_ref: str) -> bytes:
+    """
+    Read a panel image back from GridFS.
+    """
+    stream = await image_bucket.open_download_stream(ObjectId(image_ref))
+    return await stream.read()
+
+async def delete_panel_images(image_refs: List[str]) -> None:
+    """
+    Delete stored panel images that no episode references any more.
+    Identical panels share one image through image_cache, so a file still used elsewhere is kept.
+    """
+    for image_ref in set(image_refs):
+        try:
+            if await db.episodes.find_one({"panels.image_ref": image_ref}, {"_id": 1}):
+                continue
+            # Drop the cache entry first so a new panel can't pick up the ref being deleted
+            await db.image_cache.delete_many({"image_ref": image_ref})
+            await image_bucket.delete(ObjectId(image_ref))
+        except (InvalidId, NoFile):
+            pass
         except Exception as e:
-            last_error = e
-            logger.error(f"Error generating image (Attempt {attempt + 1}): {str(e)}")
-            
-            # Check if we should retry
-            should_retry = attempt < max_retries - 1
-            
-            if should_retry:
-                import asyncio
-                # Exponential backoff with jitter: delay * 2^attempt + random(0-1s)
-                jitter = random.random()
-                delay = (base_delay * (2 ** attempt)) + jitter
-                logger.info(f"Retrying in {delay:.2f} seconds...")
-                await asyncio.sleep(delay)
-            
-    # If we get here, all retries failed
-    raise HTTPException(status_code=500, detail=f"Image generation failed after {max_retries} attempts: {str(last_error)}")
+            logger.warning("Failed to delete panel image %s: %s", image_ref, e)
+
+async def migrate_inline_images() -> None:
+    """
+    Move panel images still stored inline as base64 into GridFS, so every panel is served by reference.
+    Safe to run from several workers at once: only one upload per panel is kept, the others are deleted.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        legacy = db.episodes.find(
+            {"panels.image_base64": {"$type": "string"}},
+            projection={"episode_id": 1, "panels.panel_id": 1, "panels.image_base64": 1}
+        )
+        async for episode in legacy:
+            for panel in episode["panels"]:
+                if not panel.get("image_base64"):
+                    continue
+                image_bytes = await loop.run_in_executor(None, base64.b64decode, panel["image_base64"])
+                # Inline images were always served as PNG
+                file_id = await image_bucket.upload_from_stream("panel.png", image_bytes, metadata={"contentType": "image/png"})
+                result = await db.episodes.update_one(
+                    {"episode_id": episode["episode_id"], "panels": {"$elemMatch": {"panel_id": panel["panel_id"], "image_base64": {"$type": "string"}}}},
+                    {"$set": {"panels.$.image_ref": str(file_id)}, "$unset": {"panels.$.image_base64": ""}}
+                )
+                if result.matched_count == 0:
+                    await image_bucket.delete(file_id)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error("Error migrating inline panel images: %s", e)
+
+async def encode_image_base64(image_bytes: bytes) -> str:
+    """
+    Base64-encode image bytes on the default thread pool so the event loop stays free.
+    """
+    loop = asyncio.get_running_loop()
+    encoded = await loop.run_in_executor(None, base64.b64encode, image_bytes)
+    return encoded.decode('ascii')
+
+async def create_panel_image(http_client: httpx.AsyncClient, scene_description: str, dialogue: str, character_profile: str, background: str) -> str:
+    """
+    Return a GridFS reference for the panel image, generating and storing it
+    only if an identical prompt hasn't been rendered before.
+    """
+    # Identical panel descriptions map to the same cached image
+    cache_key = hashlib.sha256(f"{scene_description}\0{dialogue}\0{character_profile}\0{background}".encode()).hexdigest()
+    try:
+        cached = await db.image_cache.find_one({"_id": cache_key})
+        if cached and cached.get("image_ref"):
+            logger.info("Image cache hit for %.12s", cache_key)
+            return cached["image_ref"]
+    except Exception as e:
+        logger.warning("Image cache lookup failed: %s", e)
+    
+    # Seed derived from the cache key so the same prompt renders the same image across replicas
+    image_ref = await generate_manga_image(
+        http_client,
+        scene_description=scene_description,
+        dialogue=dialogue,
+        character_profile=character_profile,
+        background=background,
+        seed=int(cache_key[:8], 16)
+    )
+    
+    try:
+        await db.image_cache.update_one(
+            {"_id": cache_key},
+            {"$setOnInsert": {"image_ref": image_ref, "created": datetime.utcnow()}},
+            upsert=True
+        )
+    except Exception as e:
+        logger.warning("Image cache write failed: %s", e)
+    
+    return image_ref
 
 # ========== API ENDPOINTS ==========
 
@@ -272,9 +481,10 @@ async def submit_story(story_input: StorySubmit):
     Submit a daily story and get a storyboard back.
     """
     try:
-        logger.info(f"Received story: {story_input.story_text[:100]}...")
+        logger.info("Received story: %.100s...", story_input.story_text)
         
         storyboard = await analyze_story_and_create_storyboard(
+            app.state.http,
             story_input.story_text,
             story_input.character_name,
             story_input.character_appearance
@@ -293,14 +503,27 @@ async def submit_story(story_input: StorySubmit):
                 scene_description=panel_data["scene_description"],
                 dialogue=panel_data["dialogue"],
                 character_description=storyboard["character_profile"],
-                background=panel_data["background"],
-                image_base64=None
+                background=panel_data["background"]
             )
             episode.panels.append(panel)
         
-        await db.episodes.insert_one(episode.dict())
+        if story_input.generate_first_image and episode.panels:
+            first = episode.panels[0]
+            try:
+                first.image_ref = await create_panel_image(
+                    app.state.http,
+                    scene_description=first.scene_description,
+                    dialogue=first.dialogue,
+                    character_profile=episode.character_profile,
+                    background=first.background
+                )
+            except Exception as e:
+                # The storyboard is still usable; the client can retry the image via /panels/generate
+                logger.error("Error generating first panel image: %s", e)
         
-        logger.info(f"Created episode: {episode.episode_id}")
+        await db.episodes.insert_one(episode.model_dump(exclude={"panels": {"__all__": {"image_base64"}}}))
+        
+        logger.info("Created episode: %s", episode.episode_id)
         
         return StoryboardResponse(
             episode_id=episode.episode_id,
@@ -310,71 +533,174 @@ async def submit_story(story_input: StorySubmit):
         )
         
     except Exception as e:
-        import traceback
-        logger.error(f"Error in submit_story: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error in submit_story: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/panels/generate")
 async def generate_panel_image(request: PanelGenerateRequest):
     """
-    Generate manga image for a specific panel using Pollinations.ai.
+    Generate manga image for a specific panel.
     """
     try:
-        episode_data = await db.episodes.find_one({"episode_id": request.episode_id})
+        # Positional projection returns only the requested panel, so sibling panels are never loaded
+        episode_data = await db.episodes.find_one(
+            {"episode_id": request.episode_id, "panels.panel_id": request.panel_id},
+            {"character_profile": 1, "panels.$": 1}
+        )
         
         if not episode_data:
-            raise HTTPException(status_code=404, detail="Episode not found")
+            raise HTTPException(status_code=404, detail="Episode or panel not found")
         
-        episode = ComicEpisode(**episode_data)
+        panel = episode_data["panels"][0]
         
-        panel = None
-        for p in episode.panels:
-            if hasattr(p, 'panel_id') and p.panel_id == request.panel_id:
-                panel = p
-                break
-        
-        if not panel:
-            raise HTTPException(status_code=404, detail="Panel not found")
+        if panel.get("image_base64"):
+            return {"image_base64": panel["image_base64"], "status": "cached"}
         
-        if hasattr(panel, 'image_base64') and panel.image_base64:
-            return {"image_base64": panel.image_base64, "status": "cached"}
+        if panel.get("image_ref"):
+            image_bytes = await load_panel_image(panel["image_ref"])
+            return {
+                "image_ref": panel["image_ref"],
+                "image_base64": await encode_image_base64(image_bytes),
+                "status": "cached"
+            }
         
-        logger.info(f"Generating image for panel {panel.panel_id}")
+        logger.info("Generating image for panel %s", request.panel_id)
         
-        image_base64 = await generate_manga_image_pollinations(
-            scene_description=panel.scene_description,
-            dialogue=panel.dialogue,
-            character_profile=episode.character_profile,
-            background=panel.background
+        image_ref = await create_panel_image(
+            app.state.http,
+            scene_description=panel["scene_description"],
+            dialogue=panel["dialogue"],
+            character_profile=episode_data.get("character_profile"),
+            background=panel["background"]
         )
         
         result = await db.episodes.update_one(
             {"episode_id": request.episode_id, "panels.panel_id": request.panel_id},
-            {"$set": {"panels.$.image_base64": image_base64}}
+            {"$set": {"panels.$.image_ref": image_ref}}
         )
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Episode or panel not found for update")
         
-        return {"image_base64": image_base64, "status": "generated"}
+        image_bytes = await load_panel_image(image_ref)
+        return {
+            "image_ref": image_ref,
+            "image_base64": await encode_image_base64(image_bytes),
+            "status": "generated"
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error generating panel image: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/panels/generate_all")
+async def generate_panel_image_bulk(request: PanelGenerateAllRequest):
+    """
+    Generate manga images for every panel of an episode concurrently.
+    Panels that already have an image are returned as cached.
+    """
+    try:
+        episode_data = await db.episodes.find_one({"episode_id": request.episode_id})
+        
+        if not episode_data:
+            raise HTTPException(status_code=404, detail="Episode not found")
+        
+        episode = ComicEpisode.model_validate(episode_data)
+        requested = episode.panels
+        if request.panel_ids is not None:
+            wanted = set(request.panel_ids)
+            requested = [p for p in episode.panels if p.panel_id in wanted]
+        pending = [p for p in requested if not (p.image_ref or p.image_base64)]
         
+        logger.info("Generating %s images for episode %s", len(pending), episode.episode_id)
+        
+        # One failure shouldn't cancel the sibling panels
+        results = await asyncio.gather(
+            *[
+                create_panel_image(
+                    app.state.http,
+                    scene_description=p.scene_description,
+                    dialogue=p.dialogue,
+                    character_profile=episode.character_profile,
+                    background=p.background
+                )
+                for p in pending
+            ],
+            return_exceptions=True
+        )
+        
+        generated = {}
+        errors = {}
+        ops = []
+        for panel, result in zip(pending, results):
+            if isinstance(result, Exception):
+                logger.error("Error generating image for panel %s: %s", panel.panel_id, result)
+                errors[panel.panel_id] = str(result)
+                continue
+            generated[panel.panel_id] = result
+            ops.append(UpdateOne(
+                {"episode_id": request.episode_id, "panels.panel_id": panel.panel_id},
+                {"$set": {"panels.$.image_ref": result}}
+            ))
+        
+        if ops:
+            await db.episodes.bulk_write(ops, ordered=False)
+        
+        # Images are returned as references; clients fetch the bytes from /panels/{image_ref}/image
+        panels = []
+        for p in requested:
+            if p.image_ref:
+                panels.append({"panel_id": p.panel_id, "image_ref": p.image_ref, "status": "cached"})
+            elif p.image_base64:
+                panels.append({"panel_id": p.panel_id, "image_ref": None, "image_base64": p.image_base64, "status": "cached"})
+            elif p.panel_id in generated:
+                panels.append({"panel_id": p.panel_id, "image_ref": generated[p.panel_id], "status": "generated"})
+            else:
+                panels.append({"panel_id": p.panel_id, "image_ref": None, "status": "failed", "error": errors[p.panel_id]})
+        
+        return {"episode_id": request.episode_id, "panels": panels}
+        
+    except HTTPException:
+        raise
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        logger.error(f"Error generating panel image: {str(e)}")
-        logger.error(f"Traceback: {error_details}")
+        logger.exception("Error generating panel images: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/episodes", response_model=List[ComicEpisode])
+@api_router.get("/panels/{image_ref}/image")
+async def get_panel_image(image_ref: str):
+    """
+    Stream a stored panel image with the content type it was generated with.
+    """
+    try:
+        stream = await image_bucket.open_download_stream(ObjectId(image_ref))
+    except (InvalidId, NoFile):
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    async def iter_chunks():
+        while True:
+            chunk = await stream.readchunk()
+            if not chunk:
+                break
+            yield chunk
+    
+    # Fall back to the type every panel used to be stored with
+    media_type = (stream.metadata or {}).get("contentType", "image/png")
+    return StreamingResponse(iter_chunks(), media_type=media_type)
+
+@api_router.get("/episodes", response_model=None, responses={200: {"model": List[ComicEpisodeSummary]}})
 async def get_all_episodes():
     try:
-        episodes = await db.episodes.find().sort("created_date", -1).to_list(100)
-        return [ComicEpisode(**ep) for ep in episodes]
+        # The list view never needs inline images, so leave them on the server.
+        # Documents are our own writes, so they go straight to orjson without a Pydantic round-trip.
+        episodes = await db.episodes.find(
+            {},
+            projection={"_id": 0, "panels.image_base64": 0}
+        ).sort("created_date", -1).to_list(100)
+        return ORJSONResponse(episodes)
     except Exception as e:
-        import traceback
-        logger.error(f"Error fetching episodes: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error fetching episodes: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/episodes/{episode_id}", response_model=ComicEpisode)
@@ -385,28 +711,33 @@ async def get_episode(episode_id: str):
         if not episode_data:
             raise HTTPException(status_code=404, detail="Episode not found")
         
-        return ComicEpisode(**episode_data)
+        return ComicEpisode.model_validate(episode_data)
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching episode: {str(e)}")
+        logger.error("Error fetching episode: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.delete("/episodes/{episode_id}")
 async def delete_episode(episode_id: str):
     try:
-        result = await db.episodes.delete_one({"episode_id": episode_id})
+        episode_data = await db.episodes.find_one_and_delete(
+            {"episode_id": episode_id},
+            projection={"panels.image_ref": 1}
+        )
         
-        if result.deleted_count == 0:
+        if not episode_data:
             raise HTTPException(status_code=404, detail="Episode not found")
         
+        await delete_panel_images([p["image_ref"] for p in episode_data.get("panels", []) if p.get("image_ref")])
+        
         return {"message": "Episode deleted", "episode_id": episode_id}
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error deleting episode: {str(e)}")
+        logger.error("Error deleting episode: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 # Include router
@@ -421,10 +752,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+async def connect_clients():
+    global client, db, image_bucket
+    
+    try:
+        print(f"Attempting to connect to MongoDB...")
+        # Pool sized for bursts of concurrent panel writes, with a few warm connections kept open
+        client = AsyncIOMotorClient(
+            mongo_url,
+            maxPoolSize=200,
+            minPoolSize=10,
+            maxIdleTimeMS=300_000,
+            serverSelectionTimeoutMS=10_000,
+            retryWrites=True,
+            **tls_options
+        )
+        print("MongoDB client initialized")
+    except Exception as connection_error:
+        print(f"MongoDB connection failed: {connection_error}")
+        # We don't raise here to allow the app to start, but DB ops will fail
+    
+    if client:
+        db = client[DB_NAME]
+        # Panel images live in GridFS so episode documents stay small
+        image_bucket = AsyncIOMotorGridFSBucket(db, bucket_name="panel_images")
+        print(f"Using database: {DB_NAME}")
+    else:
+        print("CRITICAL: Could not initialize MongoDB client. Database operations will fail.")
+
+async def create_indexes():
+    try:
+        # Expire cached images after 7 days
+        await db.image_cache.create_index("created", expireAfterSeconds=604800)
+        # Panel lookups/updates filter on both ids; the list view sorts newest first
+        await db.episodes.create_index([("episode_id", 1), ("panels.panel_id", 1)])
+        await db.episodes.create_index([("created_date", -1)])
+        # Reference checks before deleting a panel image
+        await db.episodes.create_index("panels.image_ref")
+        await db.image_cache.create_index("image_ref")
+        # Created last so a legacy duplicate episode_id can't block the other indexes
+        await db.episodes.create_index("episode_id", unique=True)
+    except Exception as e:
+        logger.error("Error creating indexes: %s", e)
+
+def shutdown_db_client():
+    if client:
+        client.close()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8003)
+    # Local runs: uvloop/httptools are used when installed, the tuned deployment flags live in Procfile and railway.json.
+    # Worker processes each import the app, so it has to be passed as an import string
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=8003,
+        workers=int(os.environ.get("WEB_CONCURRENCY", "1")),
+        loop="auto",
+        http="auto",
+        log_level="info"
+    )
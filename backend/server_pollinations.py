@@ -253,16 +253,13 @@ async def generate_panel_image(request: PanelGenerateRequest):
         
         episode = ComicEpisode(**episode_data)
         
-        panel = None
-        for p in episode.panels:
-            if hasattr(p, 'panel_id') and p.panel_id == request.panel_id:
-                panel = p
-                break
+        panels_by_id = {p.panel_id: p for p in episode.panels}
+        panel = panels_by_id.get(request.panel_id)
         
         if not panel:
             raise HTTPException(status_code=404, detail="Panel not found")
         
-        if hasattr(panel, 'image_base64') and panel.image_base64:
+        if panel.image_base64:
             return {"image_base64": panel.image_base64, "status": "cached"}
         
         logger.info(f"Generating image for panel {panel.panel_id}")
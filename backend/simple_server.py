@@ -1,24 +1,65 @@
 from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 import os
 import logging
 from pathlib import Path
 import uuid
-from datetime import datetime
-import base64
+import secrets
+import binascii
+import asyncio
 import httpx
 import urllib.parse
 import json
 import re
+import time
+import random
+import hashlib
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from image_backends import response_content_type
+
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+    DefaultResponse = ORJSONResponse
+except ImportError:
+    # orjson is optional here (not in requirements_pollinations.txt)
+    _loads = json.loads
+    _dumps = lambda obj: json.dumps(obj).encode('utf-8')
+    DefaultResponse = JSONResponse
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled clients per process so Pollinations connections stay alive between requests;
+    # HTTP/2 lets concurrent panel requests share a connection instead of opening one each.
+    # Text and image calls get separate pools so a burst of one can't starve the other.
+    app.state.http_text = httpx.AsyncClient(
+        timeout=60.0,
+        limits=httpx.Limits(max_connections=16, max_keepalive_connections=8),
+        http2=True
+    )
+    app.state.http_image = httpx.AsyncClient(
+        timeout=60.0,
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        http2=True
+    )
+    try:
+        yield
+    finally:
+        await app.state.http_text.aclose()
+        await app.state.http_image.aclose()
+
 # Create the main app
-app = FastAPI()
+app = FastAPI(default_response_class=DefaultResponse, lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
 
 # Configure logging
@@ -28,6 +69,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# LLM replies often wrap the JSON object in a markdown code fence
+_FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+# Fallback for LLM replies that wrap the JSON object in extra prose
+_JSON_RE = re.compile(r'\{.*\}', re.DOTALL)
+
+# GETs to Pollinations are idempotent, so transient failures are retried a few times
+RETRY_ATTEMPTS = 3
+
+# Consecutive failed Pollinations calls before requests short-circuit, and how long until a probe is let through
+BREAKER_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30.0
+
+# Multiple of 3 so every streamed chunk base64-encodes without a carry
+IMAGE_CHUNK_SIZE = 3 * 21845
+
+# Bulkheads: separate per-process quotas for the slow text and image calls, so a burst of
+# panel renders can't hold up new story submissions (and stays under Pollinations rate limits)
+TEXT_SEM = asyncio.Semaphore(int(os.getenv("TEXT_CONCURRENCY", "8")))
+PANEL_SEM = asyncio.Semaphore(int(os.getenv("PANEL_CONCURRENCY", "6")))
+
+# Identical story submissions reuse the parsed storyboard instead of another LLM round-trip
+STORYBOARD_CACHE_SIZE = 256
+STORYBOARD_CACHE_TTL = 3600.0
+storyboard_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+# Pollinations calls currently running, keyed by what they fetch: key -> [task, waiter count]
+in_flight: Dict[str, list] = {}
+
 # ========== MODELS ==========
 class Panel(BaseModel):
     panel_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -38,18 +107,12 @@ class Panel(BaseModel):
     background: str
     image_base64: Optional[str] = None
 
-class ComicEpisode(BaseModel):
-    episode_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    title: str
-    user_story_text: str
-    created_date: datetime = Field(default_factory=datetime.utcnow)
-    panels: List[Panel] = []
-    character_profile: Optional[str] = None
-
 class StorySubmit(BaseModel):
     story_text: str
     character_name: Optional[str] = None
     character_appearance: Optional[str] = None
+    # Render every panel's image before responding instead of one /panels/generate call per panel
+    generate_all_images: bool = False
 
 class StoryboardResponse(BaseModel):
     episode_id: str
@@ -60,26 +123,33 @@ class StoryboardResponse(BaseModel):
 class PanelGenerateRequest(BaseModel):
     episode_id: str
     panel_id: str
+    # Echoed from the storyboard response, since nothing is stored server-side
+    scene_description: str
+    dialogue: str
+    background: str
+    character_profile: str
 
-# ========== HELPER FUNCTIONS ==========
-async def analyze_story_and_create_storyboard(story_text: str, character_name: Optional[str], character_appearance: Optional[str]) -> dict:
-    """
-    Use Pollinations.ai (Free Text API) to analyze the story and create a storyboard.
-    """
-    try:
-        # Create character profile
-        char_name = character_name or "the main character"
-        char_appearance = character_appearance or "a young person with expressive eyes, dark hair, casual modern clothing"
-        
-        character_profile = f"{char_name}: {char_appearance}"
-        
-        # Construct prompt for Pollinations
-        system_instruction = "You are a manga story expert. Analyze the story and break it into 4-6 dramatic manga-style scenes. Return ONLY valid JSON."
-        
-        prompt = f"""{system_instruction}
+class PanelLLM(BaseModel):
+    # One panel as the LLM describes it; unknown keys are ignored
+    scene_description: str
+    dialogue: str = "..."
+    background: str = "A simple background"
+
+class StoryboardLLM(BaseModel):
+    # Shape we ask the LLM for; a reply that doesn't fit falls back to the stub storyboard
+    title: str = "My Daily Story"
+    # At least one panel, so {} or a stray prose object never becomes an empty episode
+    panels: List[PanelLLM] = Field(min_length=1)
 
-Story: {story_text}
-Main Character: {character_profile}
+# ========== PROMPTS ==========
+
+STORYBOARD_SYSTEM_INSTRUCTION = "You are a manga story expert. Analyze the story and break it into 4-6 dramatic manga-style scenes. Return ONLY valid JSON."
+
+# Built once; each request only fills in the placeholders
+STORYBOARD_PROMPT_TEMPLATE = STORYBOARD_SYSTEM_INSTRUCTION + """
+
+Story: {story}
+Main Character: {profile}
 
 Create 4-6 manga panels. For each panel provide:
 1. scene_description (visual)
@@ -98,189 +168,505 @@ Format as JSON:
   ]
 }}
 """
+
+IMAGE_PROMPT_TEMPLATE = "manga style comic panel, black and white, screentones, {scene}, character {character}, setting {background}, mood {mood}, high quality, detailed line art"
+
+# ========== HELPER FUNCTIONS ==========
+class BreakerOpen(Exception):
+    pass
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after repeated failures, then lets a single
+    probe request through once the reset period has passed (half-open).
+    """
+    def __init__(self, name: str, threshold: int = BREAKER_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+    
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.probing or time.monotonic() - self.opened_at < self.reset_seconds:
+            return False
+        self.probing = True
+        return True
+    
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info("%s recovered, closing circuit", self.name)
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+    
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.failures >= self.threshold:
+            if self.opened_at is None:
+                logger.warning("%s failed %s times in a row, opening circuit", self.name, self.failures)
+            self.opened_at = time.monotonic()
+    
+    def release(self) -> None:
+        # The call was abandoned (e.g. cancelled) without telling us anything about the upstream
+        self.probing = False
+
+text_breaker = CircuitBreaker("text.pollinations.ai")
+image_breaker = CircuitBreaker("image.pollinations.ai")
+
+async def get_with_retry(client: httpx.AsyncClient, url: httpx.URL, breaker: CircuitBreaker, attempts: int = RETRY_ATTEMPTS, stream: bool = False, **kwargs) -> httpx.Response:
+    """
+    GET url, retrying network errors and upstream 5xx with exponential backoff and jitter.
+    Other statuses, and the last attempt's response, are returned to the caller.
+    With stream=True the body is left unread and the caller must close the response.
+    Raises BreakerOpen without touching the network while the upstream's circuit is open.
+    """
+    if not breaker.allow():
+        raise BreakerOpen(f"{breaker.name} is unavailable, skipping request")
+    try:
+        response = await send_with_retry(client, url, attempts, stream, **kwargs)
+    except httpx.TransportError:
+        breaker.record_failure()
+        raise
+    except BaseException:
+        breaker.release()
+        raise
+    
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+async def send_with_retry(client: httpx.AsyncClient, url: httpx.URL, attempts: int, stream: bool, **kwargs) -> httpx.Response:
+    for attempt in range(attempts):
+        last_attempt = attempt == attempts - 1
+        try:
+            response = await client.send(client.build_request("GET", url, **kwargs), stream=stream)
+        except httpx.TransportError as e:
+            if last_attempt:
+                raise
+            logger.warning("Pollinations request failed (%s), retrying", type(e).__name__)
+        else:
+            if response.status_code < 500 or last_attempt:
+                return response
+            await response.aclose()
+            logger.warning("Pollinations returned %s, retrying", response.status_code)
+        
+        await asyncio.sleep(0.25 * 2 ** attempt + random.random() * 0.25)
+
+async def single_flight(key: str, coro_factory: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Run coro_factory() once per key at a time; callers arriving while it is
+    in flight await the same result (or exception) instead of starting their own.
+    The shared call is cancelled only once every caller waiting on it has gone.
+    """
+    entry = in_flight.get(key)
+    if entry is None:
+        task = asyncio.ensure_future(coro_factory())
+        entry = in_flight[key] = [task, 0]
+        task.add_done_callback(lambda done: in_flight.pop(key, None) if in_flight.get(key) is entry else None)
+    task = entry[0]
+    
+    entry[1] += 1
+    try:
+        # shield: one caller giving up mustn't cancel the call for everyone else waiting on it
+        return await asyncio.shield(task)
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and not task.done():
+            # Unlist it now: the done-callback runs a loop iteration later, and a caller
+            # joining in between would only get the CancelledError
+            if in_flight.get(key) is entry:
+                del in_flight[key]
+            task.cancel()
+
+def storyboard_cache_key(story_text: str, character_name: Optional[str], character_appearance: Optional[str]) -> str:
+    return hashlib.blake2b(f"{story_text}\0{character_name or ''}\0{character_appearance or ''}".encode(), digest_size=16).hexdigest()
+
+def get_cached_storyboard(key: str) -> Optional[dict]:
+    entry = storyboard_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, storyboard = entry
+    if expires_at <= time.monotonic():
+        del storyboard_cache[key]
+        return None
+    storyboard_cache.move_to_end(key)
+    return storyboard
+
+def cache_storyboard(key: str, storyboard: dict) -> None:
+    storyboard_cache[key] = (time.monotonic() + STORYBOARD_CACHE_TTL, storyboard)
+    storyboard_cache.move_to_end(key)
+    # Least recently used entries go first
+    while len(storyboard_cache) > STORYBOARD_CACHE_SIZE:
+        storyboard_cache.popitem(last=False)
+
+async def analyze_story_and_create_storyboard(client: httpx.AsyncClient, story_text: str, character_name: Optional[str], character_appearance: Optional[str]) -> dict:
+    """
+    Use Pollinations.ai (Free Text API) to analyze the story and create a storyboard.
+    """
+    try:
+        # Create character profile
+        char_name = character_name or "the main character"
+        char_appearance = character_appearance or "a young person with expressive eyes, dark hair, casual modern clothing"
+        
+        character_profile = f"{char_name}: {char_appearance}"
+        
+        cache_key = storyboard_cache_key(story_text, character_name, character_appearance)
+        cached = get_cached_storyboard(cache_key)
+        if cached is not None:
+            logger.info("Storyboard cache hit")
+            return cached
+        
+        # Construct prompt for Pollinations
+        prompt = STORYBOARD_PROMPT_TEMPLATE.format_map({"story": story_text, "profile": character_profile})
         
         logger.info("Sending request to Pollinations Text API...")
-        encoded_prompt = urllib.parse.quote(prompt)
-        url = f"https://text.pollinations.ai/{encoded_prompt}"
+        # Prompt is a single path segment, so '/' has to be escaped too
+        encoded_prompt = urllib.parse.quote_from_bytes(prompt.encode('utf-8'), safe=b'')
+        # Parsed once here and reused by every retry
+        url = httpx.URL(f"https://text.pollinations.ai/{encoded_prompt}")
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.get(url)
-            if response.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"Pollinations Text API failed: {response.status_code}")
-            
-            response_text = response.text
-            logger.info(f"Pollinations Response: {response_text[:100]}...")
-
-        # Parse JSON
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0].strip()
+        # Concurrent submissions of the same story share one LLM call
+        response_text = await single_flight(f"storyboard:{cache_key}", lambda: fetch_storyboard_text(client, url))
+
+        # Parse JSON, preferring the object inside a ``` / ```json fence when there is one
+        fence_match = _FENCE_RE.search(response_text)
+        if fence_match:
+            response_text = fence_match.group(1)
             
         try:
-            storyboard_data = json.loads(response_text)
+            storyboard_data = _loads(response_text)
         except json.JSONDecodeError:
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError, so this covers both parsers
+            json_match = _JSON_RE.search(response_text)
             if json_match:
-                storyboard_data = json.loads(json_match.group())
+                storyboard_data = _loads(json_match.group())
             else:
                 raise ValueError("Could not parse JSON from response")
 
-        return {
-            "title": storyboard_data.get("title", "My Daily Story"),
+        validated = StoryboardLLM.model_validate(storyboard_data, strict=False)
+        storyboard = {
+            "title": validated.title,
             "character_profile": character_profile,
-            "panels": storyboard_data.get("panels", [])
+            "panels": validated.model_dump()["panels"]
         }
+        # Only parsed storyboards are cached; the fallback below should be retried next time
+        cache_storyboard(cache_key, storyboard)
+        return storyboard
         
+    except BreakerOpen as e:
+        logger.warning("%s", e)
+        return fallback_storyboard(char_name, character_profile)
     except Exception as e:
-        logger.error(f"Error in story analysis: {str(e)}")
-        return {
-            "title": "My Daily Story",
-            "character_profile": character_profile,
-            "panels": [
-                {
-                    "scene_description": f"{char_name} is standing there.",
-                    "dialogue": "...",
-                    "background": "A simple background"
-                }
-            ]
-        }
+        logger.error("Error in story analysis: %s", e)
+        return fallback_storyboard(char_name, character_profile)
+
+def fallback_storyboard(char_name: str, character_profile: str) -> dict:
+    """
+    Single-panel storyboard used when the LLM can't be reached or returns garbage.
+    """
+    return {
+        "title": "My Daily Story",
+        "character_profile": character_profile,
+        "panels": [
+            {
+                "scene_description": f"{char_name} is standing there.",
+                "dialogue": "...",
+                "background": "A simple background"
+            }
+        ]
+    }
+
+async def fetch_storyboard_text(client: httpx.AsyncClient, url: httpx.URL) -> str:
+    async with TEXT_SEM:
+        response = await get_with_retry(client, url, text_breaker)
+    if response.status_code != 200:
+        raise HTTPException(status_code=500, detail=f"Pollinations Text API failed: {response.status_code}")
+    
+    response_text = response.text
+    logger.info("Pollinations Response (%s): %.100s...", response.http_version, response_text)
+    return response_text
 
-async def generate_manga_image_pollinations(scene_description: str, dialogue: str, character_profile: str, background: str) -> str:
+def manga_image_prompt(scene_description: str, dialogue: str, character_profile: str, background: str) -> str:
+    return IMAGE_PROMPT_TEMPLATE.format_map({
+        "scene": scene_description,
+        "character": character_profile,
+        "background": background,
+        "mood": dialogue
+    })
+
+async def open_manga_image_stream(client: httpx.AsyncClient, scene_description: str, dialogue: str, character_profile: str, background: str) -> httpx.Response:
+    """
+    Start a Pollinations.ai image request and return the successful response with its body unread.
+    The caller must close the response.
+    """
+    base_prompt = manga_image_prompt(scene_description, dialogue, character_profile, background)
+    encoded_prompt = urllib.parse.quote_from_bytes(base_prompt.encode('utf-8'), safe=b'')
+    
+    image_url = httpx.URL(
+        f"https://image.pollinations.ai/prompt/{encoded_prompt}",
+        params={"width": 1024, "height": 1024, "seed": uuid.uuid4().int % 100000, "nologo": "true"}
+    )
+    
+    logger.info("Generating image with Pollinations.ai")
+    
+    response = await get_with_retry(client, image_url, image_breaker, stream=True, timeout=30.0)
+    if response.status_code != 200:
+        await response.aclose()
+        raise HTTPException(status_code=500, detail=f"Failed to generate image from Pollinations.ai: {response.status_code}")
+    logger.info("Pollinations image stream opened over %s", response.http_version)
+    return response
+
+async def generate_manga_image_pollinations(client: httpx.AsyncClient, scene_description: str, dialogue: str, character_profile: str, background: str) -> str:
     """
     Generate a manga-style image using Pollinations.ai (Free API).
     Returns base64 encoded image.
     """
     try:
-        base_prompt = f"manga style comic panel, black and white, screentones, {scene_description}, character {character_profile}, setting {background}, mood {dialogue}, high quality, detailed line art"
-        encoded_prompt = urllib.parse.quote(base_prompt)
-        
-        image_url = f"https://image.pollinations.ai/prompt/{encoded_prompt}?width=1024&height=1024&seed={uuid.uuid4().int % 100000}&nologo=true"
-        
-        logger.info(f"Generating image with Pollinations.ai")
-        
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(image_url)
-            if response.status_code == 200:
-                image_bytes = response.content
-                image_base64 = base64.b64encode(image_bytes).decode('utf-8')
-                return image_base64
-            else:
-                raise HTTPException(status_code=500, detail=f"Failed to generate image from Pollinations.ai: {response.status_code}")
+        # Identical panels requested at the same time share one image
+        key = "image:" + manga_image_prompt(scene_description, dialogue, character_profile, background)
+        return await single_flight(
+            key,
+            lambda: fetch_manga_image_base64(client, scene_description, dialogue, character_profile, background)
+        )
             
+    except BreakerOpen as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        logger.error(f"Error generating image with Pollinations.ai: {str(e)}")
+        logger.error("Error generating image with Pollinations.ai: %s", e)
         raise HTTPException(status_code=500, detail=f"Image generation failed: {str(e)}")
 
+async def fetch_manga_image_base64(client: httpx.AsyncClient, scene_description: str, dialogue: str, character_profile: str, background: str) -> str:
+    async with PANEL_SEM:
+        response = await open_manga_image_stream(client, scene_description, dialogue, character_profile, background)
+        
+        # Encode chunk by chunk so the raw image is never buffered next to its base64 copy
+        encoded = bytearray()
+        leftover = b""
+        try:
+            async for chunk in response.aiter_bytes(IMAGE_CHUNK_SIZE):
+                data = leftover + chunk if leftover else chunk
+                # Only whole 3-byte groups encode without padding; carry the rest to the next chunk
+                cut = len(data) - len(data) % 3
+                encoded += binascii.b2a_base64(data[:cut], newline=False)
+                leftover = data[cut:]
+        finally:
+            await response.aclose()
+        
+        encoded += binascii.b2a_base64(leftover, newline=False)
+        return encoded.decode('ascii')
+
+async def render_panel(client: httpx.AsyncClient, panel: Panel, character_profile: str) -> str:
+    """
+    Generate one panel's image.
+    """
+    return await generate_manga_image_pollinations(
+        client,
+        scene_description=panel.scene_description,
+        dialogue=panel.dialogue,
+        character_profile=character_profile,
+        background=panel.background
+    )
+
+async def generate_all_panels(client: httpx.AsyncClient, panels: List[Panel], character_profile: str) -> list:
+    """
+    Generate images for all panels concurrently, at most PANEL_SEM's limit at a time.
+    Returns base64 images in panel order; a failed panel yields its exception instead.
+    """
+    # One failure shouldn't cancel the sibling panels
+    return await asyncio.gather(*[render_panel(client, p, character_profile) for p in panels], return_exceptions=True)
+
+def allocate_ids(count: int) -> List[str]:
+    """
+    Return count random (version 4) UUID strings drawn from a single urandom read.
+    """
+    raw = secrets.token_bytes(16 * count)
+    return [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, len(raw), 16)]
+
+def build_storyboard_response(storyboard: dict) -> StoryboardResponse:
+    """
+    Turn a parsed storyboard into a response with ordered panels.
+    """
+    episode_id, *panel_ids = allocate_ids(len(storyboard["panels"]) + 1)
+    panels = [
+        Panel(
+            panel_id=panel_ids[idx],
+            order=idx,
+            scene_description=panel_data["scene_description"],
+            dialogue=panel_data["dialogue"],
+            character_description=storyboard["character_profile"],
+            background=panel_data["background"],
+            image_base64=None
+        )
+        for idx, panel_data in enumerate(storyboard["panels"])
+    ]
+    
+    # Nothing is stored here, so there's no episode model; the panels are already validated
+    return StoryboardResponse.model_construct(
+        episode_id=episode_id,
+        title=storyboard["title"],
+        character_profile=storyboard["character_profile"],
+        panels=panels
+    )
+
 # ========== API ENDPOINTS ==========
 @api_router.get("/")
 async def root():
     return {"message": "DailyToon API", "status": "running"}
 
-@api_router.post("/story/submit", response_model=StoryboardResponse)
+# response_model=None so FastAPI doesn't validate the already-built response a second time
+@api_router.post("/story/submit", response_model=None, responses={200: {"model": StoryboardResponse}})
 async def submit_story(story_input: StorySubmit):
     """
     Submit a daily story and get a storyboard back.
     """
     try:
-        logger.info(f"Received story: {story_input.story_text[:100]}...")
+        logger.info("Received story: %.100s...", story_input.story_text)
         
         storyboard = await analyze_story_and_create_storyboard(
+            app.state.http_text,
             story_input.story_text,
             story_input.character_name,
             story_input.character_appearance
         )
         
-        episode = ComicEpisode(
-            title=storyboard["title"],
-            user_story_text=story_input.story_text,
-            character_profile=storyboard["character_profile"],
-            panels=[]
-        )
+        episode = build_storyboard_response(storyboard)
         
-        for idx, panel_data in enumerate(storyboard["panels"]):
-            panel = Panel(
-                order=idx,
-                scene_description=panel_data["scene_description"],
-                dialogue=panel_data["dialogue"],
-                character_description=storyboard["character_profile"],
-                background=panel_data["background"],
-                image_base64=None
-            )
-            episode.panels.append(panel)
+        if story_input.generate_all_images:
+            images = await generate_all_panels(app.state.http_image, episode.panels, episode.character_profile)
+            for panel, image in zip(episode.panels, images):
+                if isinstance(image, Exception):
+                    # The client can still retry this panel through /panels/generate
+                    logger.error("Error generating image for panel %s: %s", panel.panel_id, image)
+                else:
+                    panel.image_base64 = image
         
         # Instead of saving to MongoDB, we'll just return the episode data
-        logger.info(f"Created episode: {episode.episode_id}")
+        logger.info("Created episode: %s", episode.episode_id)
         
-        return StoryboardResponse(
-            episode_id=episode.episode_id,
-            title=episode.title,
-            character_profile=episode.character_profile,
-            panels=episode.panels
-        )
+        return episode
         
     except Exception as e:
-        import traceback
-        logger.error(f"Error in submit_story: {str(e)}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Error in submit_story: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.post("/story/submit/stream")
+async def submit_story_stream(story_input: StorySubmit):
+    """
+    Like /story/submit, but streams the result as NDJSON: an episode line,
+    one line per panel, then (with generate_all_images) one line per panel
+    image in the order the images finish.
+    """
+    logger.info("Received story: %.100s...", story_input.story_text)
+    
+    storyboard = await analyze_story_and_create_storyboard(
+        app.state.http_text,
+        story_input.story_text,
+        story_input.character_name,
+        story_input.character_appearance
+    )
+    episode = build_storyboard_response(storyboard)
+    logger.info("Created episode: %s", episode.episode_id)
+    
+    async def ndjson_lines():
+        yield _dumps({
+            "episode_id": episode.episode_id,
+            "title": episode.title,
+            "character_profile": episode.character_profile
+        }) + b"\n"
+        for panel in episode.panels:
+            yield _dumps({"panel": panel.model_dump(mode="json", exclude={"image_base64"})}) + b"\n"
+        
+        if not story_input.generate_all_images:
+            return
+        
+        tasks = {
+            asyncio.ensure_future(render_panel(app.state.http_image, panel, episode.character_profile)): panel
+            for panel in episode.panels
+        }
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    panel = tasks[task]
+                    if task.exception() is not None:
+                        logger.error("Error generating image for panel %s: %s", panel.panel_id, task.exception())
+                        line = {"panel_image": {"panel_id": panel.panel_id, "image_base64": None, "error": str(task.exception())}}
+                    else:
+                        line = {"panel_image": {"panel_id": panel.panel_id, "image_base64": task.result()}}
+                    yield _dumps(line) + b"\n"
+        finally:
+            # Client went away mid-stream: don't keep rendering images nobody will read
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
 @api_router.post("/panels/generate")
 async def generate_panel_image(request: PanelGenerateRequest):
     """
     Generate manga image for a specific panel using Pollinations.ai.
     """
     try:
-        # For testing purposes, we'll create a mock episode with sample data
-        # In a real implementation, this would fetch from a database
-        
-        # Create a mock episode with sample data
-        mock_episode = ComicEpisode(
-            episode_id=request.episode_id,
-            title="Test Episode",
-            user_story_text="Test story",
-            character_profile="Test character",
-            panels=[
-                Panel(
-                    panel_id=request.panel_id,
-                    order=0,
-                    scene_description="A test scene with a character",
-                    dialogue="This is a test dialogue",
-                    character_description="Test character",
-                    background="A simple background",
-                    image_base64=None
-                )
-            ]
-        )
-        
-        # Find the panel
-        panel = None
-        for p in mock_episode.panels:
-            if hasattr(p, 'panel_id') and p.panel_id == request.panel_id:
-                panel = p
-                break
-        
-        if not panel:
-            raise HTTPException(status_code=404, detail="Panel not found")
-        
-        logger.info(f"Generating image for panel {panel.panel_id}")
+        # Stateless server: the client sends back the panel fields from its storyboard response
+        logger.info("Generating image for panel %s", request.panel_id)
         
         image_base64 = await generate_manga_image_pollinations(
-            scene_description=panel.scene_description,
-            dialogue=panel.dialogue,
-            character_profile=mock_episode.character_profile,
-            background=panel.background
+            app.state.http_image,
+            scene_description=request.scene_description,
+            dialogue=request.dialogue,
+            character_profile=request.character_profile,
+            background=request.background
         )
         
         return {"image_base64": image_base64, "status": "generated"}
         
+    except HTTPException:
+        raise
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        logger.error(f"Error generating panel image: {str(e)}")
-        logger.error(f"Traceback: {error_details}")
+        logger.exception("Error generating panel image: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/panels/{panel_id}/image")
+async def stream_panel_image(panel_id: str, scene_description: str, dialogue: str, background: str, character_profile: str):
+    """
+    Generate a panel image and stream the raw bytes straight from Pollinations.ai,
+    without the base64/JSON wrapping of /panels/generate.
+    """
+    try:
+        logger.info("Streaming image for panel %s", panel_id)
+        # Pollinations renders before it sends headers, so the quota covers the slow part
+        async with PANEL_SEM:
+            response = await open_manga_image_stream(app.state.http_image, scene_description, dialogue, character_profile, background)
+    except BreakerOpen as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error generating image with Pollinations.ai: %s", e)
+        raise HTTPException(status_code=500, detail=f"Image generation failed: {str(e)}")
+    
+    async def image_chunks():
+        try:
+            async for chunk in response.aiter_bytes(IMAGE_CHUNK_SIZE):
+                yield chunk
+        finally:
+            await response.aclose()
+    
+    # The background close also covers a client that disconnects before the body starts
+    return StreamingResponse(
+        image_chunks(),
+        media_type=response_content_type(response),
+        background=BackgroundTask(response.aclose)
+    )
+
 # Include router
 app.include_router(api_router)
 
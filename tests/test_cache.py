@@ -0,0 +1,59 @@
+from cache import StoryCache
+
+STORY = (
+    "Today I woke up early and went for a run in the park, then I had coffee "
+    "with my friend Sara and we talked about her new job at the bakery downtown."
+)
+
+
+def make_cache():
+    cache = StoryCache(ttl=3600.0)
+    cache.set("storyboard", "profile", STORY, "storyboard-1")
+    return cache
+
+
+def test_same_story_hits():
+    assert make_cache().get("storyboard", "profile", STORY) == "storyboard-1"
+
+
+def test_case_punctuation_and_spacing_are_ignored():
+    variant = "  " + STORY.upper().replace(",", "").replace(" ", "  ")
+    assert make_cache().get("storyboard", "profile", variant) == "storyboard-1"
+
+
+def test_swapped_words_miss():
+    cache = StoryCache(ttl=3600.0)
+    cache.set("storyboard", "profile", "the man bit the dog", "storyboard-1")
+    assert cache.get("storyboard", "profile", "the dog bit the man") is None
+
+
+def test_one_word_edit_misses():
+    edited = STORY.replace("early", "late")
+    assert make_cache().get("storyboard", "profile", edited) is None
+
+
+def test_partitions_are_separate():
+    assert make_cache().get("storyboard", "other profile", STORY) is None
+
+
+def test_expired_entries_miss():
+    cache = StoryCache(ttl=-1.0)
+    cache.set("storyboard", "profile", STORY, "storyboard-1")
+    assert cache.get("storyboard", "profile", STORY) is None
+
+
+def test_resubmitting_replaces_the_entry():
+    cache = make_cache()
+    cache.set("storyboard", "profile", STORY.upper(), "storyboard-2")
+    assert cache.get("storyboard", "profile", STORY) == "storyboard-2"
+    assert len(cache._entries) == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = StoryCache(ttl=3600.0, max_entries=2)
+    cache.set("storyboard", "profile", "first story", "storyboard-1")
+    cache.set("storyboard", "profile", "second story", "storyboard-2")
+    cache.get("storyboard", "profile", "first story")
+    cache.set("storyboard", "profile", "third story", "storyboard-3")
+    assert cache.get("storyboard", "profile", "second story") is None
+    assert cache.get("storyboard", "profile", "first story") == "storyboard-1"
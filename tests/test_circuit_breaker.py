@@ -0,0 +1,112 @@
+import asyncio
+
+import httpx
+import pytest
+
+import simple_server
+from simple_server import BreakerOpen, CircuitBreaker
+
+URL = httpx.URL("https://image.pollinations.ai/prompt/x")
+
+
+@pytest.fixture(autouse=True)
+def single_attempt(monkeypatch):
+    monkeypatch.setattr(simple_server, "send_with_retry", send_once)
+
+
+async def send_once(client, url, attempts, stream, **kwargs):
+    # The breaker sees one outcome per get_with_retry call, retries are covered separately
+    return await client.send(client.build_request("GET", url, **kwargs), stream=stream)
+
+
+def get(breaker, handler):
+    calls = []
+
+    async def counting(request):
+        calls.append(request)
+        return await handler(request)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(counting)) as client:
+            response = await simple_server.get_with_retry(client, URL, breaker)
+            return response.status_code
+
+    try:
+        return asyncio.run(main()), len(calls)
+    except Exception as e:
+        return type(e), len(calls)
+
+
+def status(code):
+    async def handler(request):
+        return httpx.Response(code)
+    return handler
+
+
+async def refused(request):
+    raise httpx.ConnectError("refused")
+
+
+def test_opens_after_threshold_failures_and_stops_calling():
+    breaker = CircuitBreaker("test", threshold=2, reset_seconds=60.0)
+    assert get(breaker, status(500)) == (500, 1)
+    assert get(breaker, refused) == (httpx.ConnectError, 1)
+    assert get(breaker, status(200)) == (BreakerOpen, 0)
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("test", threshold=2, reset_seconds=60.0)
+    get(breaker, status(500))
+    get(breaker, status(200))
+    get(breaker, status(500))
+    assert breaker.opened_at is None
+
+
+def test_client_errors_do_not_count_as_failures():
+    breaker = CircuitBreaker("test", threshold=1, reset_seconds=60.0)
+    assert get(breaker, status(404)) == (404, 1)
+    assert breaker.opened_at is None
+
+
+def test_half_open_lets_a_single_probe_through():
+    breaker = CircuitBreaker("test", threshold=1, reset_seconds=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_successful_probe_closes_the_circuit():
+    breaker = CircuitBreaker("test", threshold=1, reset_seconds=0.0)
+    breaker.record_failure()
+    assert get(breaker, status(200)) == (200, 1)
+    assert breaker.opened_at is None and not breaker.probing
+
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = CircuitBreaker("test", threshold=1, reset_seconds=60.0)
+    breaker.record_failure()
+    breaker.opened_at -= 60.0
+    assert get(breaker, status(503)) == (503, 1)
+    assert get(breaker, status(200)) == (BreakerOpen, 0)
+
+
+def test_cancelled_probe_is_released():
+    breaker = CircuitBreaker("test", threshold=1, reset_seconds=0.0)
+    breaker.record_failure()
+
+    async def hang(request):
+        await asyncio.Event().wait()
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(hang)) as client:
+            probe = asyncio.ensure_future(simple_server.get_with_retry(client, URL, breaker))
+            await asyncio.sleep(0)
+            assert breaker.probing
+            probe.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await probe
+
+    asyncio.run(main())
+    assert not breaker.probing
+    assert breaker.failures == 1
+    assert breaker.allow()
@@ -0,0 +1,28 @@
+from server import extract_json_object
+
+
+def test_object_surrounded_by_prose():
+    assert extract_json_object('Sure! {"title": "Day"} Hope that helps.') == '{"title": "Day"}'
+
+
+def test_nested_objects_are_kept_whole():
+    text = 'x {"a": {"b": {}}, "c": 1} {"second": 2}'
+    assert extract_json_object(text) == '{"a": {"b": {}}, "c": 1}'
+
+
+def test_braces_inside_strings_are_ignored():
+    text = '{"dialogue": "she drew a } and a {", "n": 1} trailing }'
+    assert extract_json_object(text) == '{"dialogue": "she drew a } and a {", "n": 1}'
+
+
+def test_escaped_quotes_do_not_end_the_string():
+    text = r'{"dialogue": "he said \"}\" loudly", "back\\": "}"} rest'
+    assert extract_json_object(text) == r'{"dialogue": "he said \"}\" loudly", "back\\": "}"}'
+
+
+def test_unbalanced_input_returns_none():
+    assert extract_json_object('{"title": "cut off", "panels": [{') is None
+
+
+def test_no_object_returns_none():
+    assert extract_json_object("no json here } at all") is None
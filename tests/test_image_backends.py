@@ -0,0 +1,23 @@
+import asyncio
+
+import httpx
+
+from image_backends import DEFAULT_CONTENT_TYPE, PollinationsBackend
+
+
+def render(response: httpx.Response):
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(lambda request: response)) as client:
+            async with PollinationsBackend().generate(client, "a", "b", "c", "d", seed=1) as image:
+                return image.content_type, b"".join([chunk async for chunk in image.chunks])
+
+    return asyncio.run(main())
+
+
+def test_upstream_content_type_is_reported():
+    response = httpx.Response(200, content=b"\xff\xd8jpeg", headers={"content-type": "image/jpeg; charset=binary"})
+    assert render(response) == ("image/jpeg", b"\xff\xd8jpeg")
+
+
+def test_missing_content_type_is_not_guessed():
+    assert render(httpx.Response(200, content=b"data")) == (DEFAULT_CONTENT_TYPE, b"data")
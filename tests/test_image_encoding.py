@@ -0,0 +1,29 @@
+import asyncio
+import base64
+
+import httpx
+import pytest
+
+import simple_server
+
+
+@pytest.fixture(autouse=True)
+def fresh_breaker(monkeypatch):
+    monkeypatch.setattr(simple_server, "image_breaker", simple_server.CircuitBreaker("test"))
+
+
+def encode(image: bytes) -> str:
+    async def main():
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=image))
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await simple_server.fetch_manga_image_base64(client, "a", "b", "c", "d")
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 5, 7, 64])
+@pytest.mark.parametrize("length", [0, 1, 2, 3, 10, 11, 100])
+def test_streamed_encoding_matches_one_shot_base64(monkeypatch, chunk_size, length):
+    monkeypatch.setattr(simple_server, "IMAGE_CHUNK_SIZE", chunk_size)
+    image = bytes(range(length))
+    assert encode(image) == base64.b64encode(image).decode("ascii")
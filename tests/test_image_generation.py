@@ -0,0 +1,28 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import server
+from image_backends import PollinationsBackend
+
+
+@pytest.mark.parametrize("upstream_status", [400, 403, 404])
+def test_upstream_client_errors_surface_as_bad_gateway(monkeypatch, upstream_status):
+    monkeypatch.setattr(server, "image_backend", PollinationsBackend())
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(upstream_status)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await server.generate_manga_image(client, "a", "b", "c", "d", seed=1)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main())
+    assert error.value.status_code == 502
+    assert str(upstream_status) in error.value.detail
+    assert len(calls) == 1
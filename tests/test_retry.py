@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+import pytest
+
+import simple_server
+
+URL = httpx.URL("https://text.pollinations.ai/prompt")
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    async def sleep(delay):
+        pass
+
+    monkeypatch.setattr(simple_server.asyncio, "sleep", sleep)
+
+
+def send(outcomes, attempts=3):
+    """
+    Run send_with_retry against an upstream that answers with outcomes in turn:
+    a status code, or an exception to raise.
+    """
+    calls = []
+
+    def handler(request):
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, text=str(outcome))
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            response = await simple_server.send_with_retry(client, URL, attempts, stream=False)
+            return response.status_code
+
+    return asyncio.run(main()), len(calls)
+
+
+def test_success_is_not_retried():
+    assert send([200]) == (200, 1)
+
+
+def test_server_errors_are_retried():
+    assert send([503, 502, 200]) == (200, 3)
+
+
+def test_last_server_error_is_returned():
+    assert send([500, 500, 500]) == (500, 3)
+
+
+def test_client_errors_are_not_retried():
+    assert send([404]) == (404, 1)
+
+
+def test_transport_errors_are_retried():
+    assert send([httpx.ConnectError("refused"), 200]) == (200, 2)
+
+
+def test_last_transport_error_is_raised():
+    with pytest.raises(httpx.ReadTimeout):
+        send([httpx.ConnectError("refused"), httpx.ConnectError("refused"), httpx.ReadTimeout("slow")])
@@ -0,0 +1,44 @@
+import asyncio
+
+import simple_server
+
+
+def test_concurrent_callers_share_one_call():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*[simple_server.single_flight("key", fetch) for _ in range(5)])
+
+    assert asyncio.run(main()) == ["result"] * 5
+    assert calls == 1
+    assert simple_server.in_flight == {}
+
+
+def test_caller_after_last_waiter_cancelled_starts_a_new_call():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def main():
+        first = asyncio.ensure_future(simple_server.single_flight("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        try:
+            await first
+        except asyncio.CancelledError:
+            pass
+        # Joins before the cancelled task's done-callback has had a chance to run
+        return await simple_server.single_flight("key", fetch)
+
+    assert asyncio.run(main()) == 2
+    assert simple_server.in_flight == {}
@@ -0,0 +1,38 @@
+import asyncio
+
+import httpx
+import pytest
+
+import simple_server
+
+
+def analyze(reply: str, story: str) -> dict:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=reply)))
+    return asyncio.run(simple_server.analyze_story_and_create_storyboard(client, story, "Ann", "red scarf"))
+
+
+@pytest.mark.parametrize("reply", [
+    '{}',
+    '{"error": "model overloaded"}',
+    'prose {"a": "}"} then nothing',
+    '{"title": "Empty", "panels": []}',
+])
+def test_replies_without_panels_fall_back_and_are_not_cached(reply):
+    story = f"a story for {reply}"
+    storyboard = analyze(reply, story)
+
+    assert storyboard == simple_server.fallback_storyboard("Ann", "Ann: red scarf")
+    key = simple_server.storyboard_cache_key(story, "Ann", "red scarf")
+    assert simple_server.get_cached_storyboard(key) is None
+
+
+def test_valid_reply_is_parsed_and_cached():
+    reply = '```json\n{"title": "Day", "panels": [{"scene_description": "Ann waves"}]}\n```'
+    storyboard = analyze(reply, "a valid story")
+
+    assert storyboard["title"] == "Day"
+    assert storyboard["panels"] == [
+        {"scene_description": "Ann waves", "dialogue": "...", "background": "A simple background"}
+    ]
+    key = simple_server.storyboard_cache_key("a valid story", "Ann", "red scarf")
+    assert simple_server.get_cached_storyboard(key) == storyboard
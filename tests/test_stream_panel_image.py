@@ -0,0 +1,32 @@
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import simple_server
+
+PANEL = {"scene_description": "a", "dialogue": "b", "background": "c", "character_profile": "d"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_breaker(monkeypatch):
+    monkeypatch.setattr(simple_server, "image_breaker", simple_server.CircuitBreaker("test"))
+
+
+def stream(headers):
+    with TestClient(simple_server.app) as client:
+        simple_server.app.state.http_image = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, content=b"\xff\xd8img", headers=headers))
+        )
+        return client.get("/api/panels/p1/image", params=PANEL)
+
+
+def test_upstream_content_type_is_passed_through_without_parameters():
+    response = stream({"content-type": "image/jpeg; charset=binary"})
+    assert response.status_code == 200
+    assert response.content == b"\xff\xd8img"
+    assert response.headers["content-type"] == "image/jpeg"
+
+
+def test_missing_content_type_is_not_guessed():
+    response = stream({})
+    assert response.headers["content-type"] == "application/octet-stream"